@@ -1,11 +1,16 @@
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional, Tuple, TypedDict
 from langchain_anthropic import ChatAnthropic
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 from tool_snowflake import SnowflakeTools
+from concurrent.futures import ThreadPoolExecutor
+from diskcache import Cache
+import hashlib
 import json
+import orjson
 import os
+import re
+from types import MappingProxyType
 from dotenv import load_dotenv
 import logging
 
@@ -14,234 +19,462 @@ load_dotenv(override=True)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class AnalysisState(BaseModel):
-    """State model for the analysis workflow using Pydantic"""
-    query: str = ""
-    data: Dict[str, Any] = Field(default_factory=dict)
-    analysis: str = ""
-    recommendations: str = ""
-    charts: List[Dict[str, Any]] = Field(default_factory=list)
-    needs_more_data: bool = False
-    data_requests: List[str] = Field(default_factory=list)
-    iteration_count: int = 0
-    
-    class Config:
-        arbitrary_types_allowed = True
+# Parameter heuristics: each group maps to one value, the leftmost mention wins.
+# Numbers must not continue into more digits, so "2024" does not read as 20.
+_DAYS_RE = re.compile(r"(?<![a-z0-9])(?:(90|ninety)|(60|sixty)|(7|seven|week))(?![0-9])")
+_LIMIT_RE = re.compile(r"(?<![a-z0-9])(?:(20|twenty)|(5|five))(?![0-9])")
+_MONTHS_RE = re.compile(r"(?<![a-z0-9])(?:(12|twelve)|(3|three))(?![0-9])")
 
-class EcommerceAgents:
-    def __init__(self):
-        self.llm = ChatAnthropic(
+def _match_choice(pattern: re.Pattern, text: str, choices: tuple, default: int) -> tuple:
+    match = pattern.search(text)
+    return (choices[match.lastindex - 1] if match else default,)
+
+def _parse_days(text: str) -> tuple:
+    return _match_choice(_DAYS_RE, text, (90, 60, 7), 30)
+
+def _parse_limit(text: str) -> tuple:
+    return _match_choice(_LIMIT_RE, text, (20, 5), 10)
+
+def _parse_months(text: str) -> tuple:
+    return _match_choice(_MONTHS_RE, text, (12, 3), 6)
+
+def _no_args(text: str) -> tuple:
+    return ()
+
+# Deterministic tool routing: (pattern, data key, SnowflakeTools method, argument parser).
+# Patterns only anchor on a preceding letter so they also match plurals and names like get_sales_trend.
+_ROUTES = [
+    (re.compile(r"(?<![a-z])(?:sales|revenue|metrics)"), "sales_metrics", "get_sales_metrics", _parse_days),
+    (re.compile(r"(?<![a-z])(?:trend|line|time series|daily)"), "sales_trend", "get_sales_trend", _parse_days),
+    (re.compile(r"(?<![a-z])(?:product|top)"), "top_products", "get_top_products", _parse_limit),
+    (re.compile(r"(?<![a-z])(?:category|categories|breakdown)"), "revenue_by_category", "get_revenue_by_category", _no_args),
+    (re.compile(r"(?<![a-z])(?:monthly|month|comparison)"), "monthly_comparison", "get_monthly_comparison", _parse_months),
+    (re.compile(r"^(?=.*(?<![a-z])customer)(?=.*(?<![a-z])segment)", re.S), "customer_segments", "get_customer_segments", _no_args),
+    (re.compile(r"(?<![a-z])(?:lifetime|ltv|top customer)"), "customer_lifetime_value", "get_customer_lifetime_value", _parse_limit),
+]
+
+# Tool schemas the analyst can call directly to request more data (Anthropic tool-use format)
+_TOOL_SCHEMAS = [
+    {
+        "name": "get_sales_metrics",
+        "description": "Revenue, orders, avg order value and unique customers over the last N days",
+        "input_schema": {"type": "object", "properties": {"days": {"type": "integer", "description": "Lookback window in days"}}}
+    },
+    {
+        "name": "get_top_products",
+        "description": "Top products by revenue",
+        "input_schema": {"type": "object", "properties": {"limit": {"type": "integer", "description": "Number of products"}}}
+    },
+    {
+        "name": "get_customer_segments",
+        "description": "Customer segmentation by income",
+        "input_schema": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "get_sales_trend",
+        "description": "Daily revenue and orders over the last N days, for LINE CHARTS",
+        "input_schema": {"type": "object", "properties": {"days": {"type": "integer", "description": "Lookback window in days"}}}
+    },
+    {
+        "name": "get_revenue_by_category",
+        "description": "Revenue breakdown by category, for PIE/BAR CHARTS",
+        "input_schema": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "get_monthly_comparison",
+        "description": "Monthly revenue comparison over the last N months, for BAR CHARTS",
+        "input_schema": {"type": "object", "properties": {"months": {"type": "integer", "description": "Number of months"}}}
+    },
+    {
+        "name": "get_customer_lifetime_value",
+        "description": "Top customers by lifetime value",
+        "input_schema": {"type": "object", "properties": {"limit": {"type": "integer", "description": "Number of customers"}}}
+    },
+]
+_TOOL_PARAMS = {schema["name"]: list(schema["input_schema"]["properties"]) for schema in _TOOL_SCHEMAS}
+_TOOL_DATA_KEYS = {method_name: data_key for _, data_key, method_name, _ in _ROUTES}
+
+# Prompt templates, filled with str.format on each call
+_EXTRACTOR_TEMPLATE = """
+{context}
+
+Available data functions:
+- get_sales_metrics(days): Revenue, orders, avg order value
+- get_top_products(limit): Top products by revenue
+- get_customer_segments(): Customer segmentation
+- get_sales_trend(days): Daily sales data for LINE CHARTS
+- get_revenue_by_category(): Revenue breakdown by category for PIE/BAR CHARTS
+- get_monthly_comparison(months): Monthly revenue comparison for BAR CHARTS
+- get_customer_lifetime_value(limit): Top customers by LTV
+
+Current data: {current_data}
+
+Determine what data to fetch. Be specific about parameters.
+For chart queries, fetch the appropriate chart data sources.
+"""
+
+_ANALYST_TEMPLATE = """
+Query: {query}
+
+Available Data Structure:
+{data}
+
+IMPORTANT: The data keys are at the top level (e.g., "top_products", "sales_trend", "customer_segments").
+Do NOT use nested paths like "top_products.top_products" - use only the top-level key name.
+
+Your tasks:
+1. Determine if you have enough data to answer the query
+2. Provide comprehensive analysis
+3. Recommend appropriate chart visualizations
+
+Available chart types:
+- line: For trends over time
+- bar: For vertical comparisons
+- pie: For proportions/percentages
+- horizontal_bar: For horizontal ranking comparisons
+
+Response format:
+SUFFICIENT: YES or NO
+
+If NO:
+Call the data tools for exactly the data you still need instead of writing the analysis.
+
+If YES:
+ANALYSIS: [your comprehensive analysis]
+CHARTS: [JSON array of chart configs]
+
+CRITICAL CHART CONFIG RULES:
+1. data_key: Use ONLY the top-level key name from the data (e.g., "top_products", NOT "top_products.top_products")
+2. x_field: ALWAYS the categorical/label field name (e.g., "product_name", "date", "segment")
+3. y_fields: ALWAYS array of numeric field names (e.g., ["total_revenue"], ["customer_count"])
+4. For pie charts: use name_field and value_field instead of x_field and y_fields
+
+Chart Examples:
+{{
+    "type": "horizontal_bar",
+    "title": "Top Products by Revenue",
+    "data_key": "top_products",
+    "x_field": "product_name",
+    "y_fields": ["total_revenue"],
+    "description": "Revenue ranking"
+}}
+
+{{
+    "type": "pie",
+    "title": "Revenue by Category",
+    "data_key": "revenue_by_category",
+    "name_field": "category",
+    "value_field": "revenue",
+    "description": "Category distribution"
+}}
+"""
+
+_CONSULTANT_TEMPLATE = """
+Original Query: {query}
+
+Analysis:
+{analysis}
+
+Based on this analysis, provide 3-5 actionable business recommendations.
+
+Format your response as:
+1. [Recommendation]: [Specific action with expected impact]
+2. [Recommendation]: [Specific action with expected impact]
+3. [Recommendation]: [Specific action with expected impact]
+
+Focus on:
+- Practical, implementable actions
+- Expected business impact
+- Specific metrics to improve
+"""
+
+# Default chart per data key, in display order. Frozen so the shared configs cannot be
+# mutated; callers get shallow dict copies.
+_DEFAULT_CHARTS = [
+    ("sales_trend", MappingProxyType({
+        "type": "line",
+        "title": "Sales Trend Over Time",
+        "data_key": "sales_trend",
+        "x_field": "date",
+        "y_fields": ("revenue",),
+        "description": "Daily revenue trend"
+    })),
+    ("top_products", MappingProxyType({
+        "type": "horizontal_bar",
+        "title": "Top Products by Revenue",
+        "data_key": "top_products",
+        "x_field": "product_name",
+        "y_fields": ("total_revenue",),
+        "description": "Product performance comparison"
+    })),
+    ("revenue_by_category", MappingProxyType({
+        "type": "pie",
+        "title": "Revenue Distribution by Category",
+        "data_key": "revenue_by_category",
+        "name_field": "category",
+        "value_field": "revenue",
+        "description": "Category revenue breakdown"
+    })),
+    ("monthly_comparison", MappingProxyType({
+        "type": "bar",
+        "title": "Monthly Revenue Comparison",
+        "data_key": "monthly_comparison",
+        "x_field": "month",
+        "y_fields": ("revenue",),
+        "description": "Month-over-month revenue performance"
+    })),
+    ("customer_segments", MappingProxyType({
+        "type": "horizontal_bar",
+        "title": "Customer Segments Distribution",
+        "data_key": "customer_segments",
+        "x_field": "segment",
+        "y_fields": ("customer_count",),
+        "description": "Customer distribution across segments"
+    })),
+]
+
+_JSON_DECODER = json.JSONDecoder()
+_SECTION_RE = re.compile(r"\b(SUFFICIENT|NEEDED|ANALYSIS|CHARTS):")
+# Markers that end each section; CHARTS runs to the end of the response
+_SECTION_ENDS = {
+    "SUFFICIENT": ("NEEDED", "ANALYSIS", "CHARTS"),
+    "NEEDED": ("ANALYSIS", "CHARTS"),
+    "ANALYSIS": ("CHARTS",),
+    "CHARTS": (),
+}
+
+# Row lists in the analyst prompt are cut to this many rows; row_count still reports the full size
+_PROMPT_SAMPLE_ROWS = 50
+
+# Repeated prompts are answered from disk for a day instead of calling Anthropic again
+_LLM_CACHE_TTL = 86400
+
+# Built once per process and shared by every EcommerceAgents instance
+_LLM = None
+_LLM_CACHE = None
+
+def _get_llm() -> ChatAnthropic:
+    """Return the process-wide Anthropic chat model.
+    
+    Every node, including the tool-bound analyst, goes through this one ChatAnthropic,
+    so all requests share one client whose connections are reused across calls.
+    """
+    global _LLM
+    if _LLM is None:
+        _LLM = ChatAnthropic(
             model="claude-sonnet-4-20250514",
             api_key=os.getenv('ANTHROPIC_API_KEY')
         )
+    return _LLM
+
+def _get_llm_cache() -> Optional[Cache]:
+    """Return the on-disk LLM response cache, or None unless LLM_CACHE_DIR is set.
+    
+    Meant for repeated dev and test runs; production leaves it unset so every prompt reaches the model.
+    """
+    global _LLM_CACHE
+    cache_dir = os.getenv("LLM_CACHE_DIR")
+    if cache_dir and _LLM_CACHE is None:
+        _LLM_CACHE = Cache(cache_dir)
+    return _LLM_CACHE if cache_dir else None
+
+def _chunk_text(content: Any) -> str:
+    """Text of a streamed message chunk; with tools bound, content arrives as a list of blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict) and block.get("type") == "text")
+
+def _split_sections(content: str) -> Dict[str, str]:
+    """Split an analyst response into its SUFFICIENT/NEEDED/ANALYSIS/CHARTS sections in one scan.
+    
+    Only the first occurrence of each marker starts a section. A section runs up to the
+    next marker listed for it in _SECTION_ENDS, so e.g. a stray "NEEDED:" inside the
+    analysis text does not cut it short.
+    """
+    matches = list(_SECTION_RE.finditer(content))
+    sections = {}
+    for i, match in enumerate(matches):
+        name = match.group(1)
+        if name in sections:
+            continue
+        end = next((later.start() for later in matches[i + 1:] if later.group(1) in _SECTION_ENDS[name]), len(content))
+        sections[name] = content[match.end():end].strip()
+    return sections
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+class AnalysisState(TypedDict, total=False):
+    """State for the analysis workflow, kept as a plain dict by LangGraph"""
+    query: str
+    data: Dict[str, Any]
+    analysis: str
+    recommendations: str
+    charts: List[Dict[str, Any]]
+    needs_more_data: bool
+    data_requests: List[str]
+    tool_calls: List[Dict[str, Any]]
+    fetched_args: Dict[str, tuple]
+    new_data: bool
+    iteration_count: int
+
+class EcommerceAgents:
+    def __init__(self):
+        self.llm = _get_llm()
+        self.analyst_llm = self.llm.bind_tools(_TOOL_SCHEMAS)
         self.tools = SnowflakeTools()
+        # Snowflake round trips are IO-bound, so independent tool calls run side by side
+        self.executor = ThreadPoolExecutor(max_workers=7, thread_name_prefix="snowflake-fetch")
         self.memory = MemorySaver()
-        self.graph = self._build_graph()
+        self.graph, self.checkpointed_graph = self._build_graph()
     
     def data_extractor(self, state: AnalysisState) -> Dict[str, Any]:
         """Extract data from Snowflake based on query analysis"""
         print("\n[DATA EXTRACTOR AGENT]")
         
-        state_dict = state.model_dump() if hasattr(state, 'model_dump') else state.dict()
-        existing_data = state_dict.get("data", {})
-        
-        if state_dict.get("data_requests"):
-            context = f"Additional data requested: {', '.join(state_dict['data_requests'])}"
-        else:
-            context = f"Initial query: {state_dict['query']}"
-        
-        prompt = f"""
-        {context}
-        
-        Available data functions:
-        - get_sales_metrics(days): Revenue, orders, avg order value
-        - get_top_products(limit): Top products by revenue
-        - get_customer_segments(): Customer segmentation
-        - get_sales_trend(days): Daily sales data for LINE CHARTS
-        - get_revenue_by_category(): Revenue breakdown by category for PIE/BAR CHARTS
-        - get_monthly_comparison(months): Monthly revenue comparison for BAR CHARTS
-        - get_customer_lifetime_value(limit): Top customers by LTV
-        
-        Current data: {list(existing_data.keys())}
+        existing_data = dict(state["data"])
+        fetched_args = dict(state.get("fetched_args", {}))
+        fetched = {}
         
-        Determine what data to fetch. Be specific about parameters.
-        For chart queries, fetch the appropriate chart data sources.
-        """
+        request_text = " ".join([state["query"], *state["data_requests"]])
         
         try:
-            response = self.llm.invoke(prompt)
-            decision = response.content.lower()
-            
-            logger.info(f"Data extractor decision: {decision}")
-            
-            # Parse decision and fetch data
-            if "sales" in decision or "revenue" in decision or "metrics" in decision:
-                days = 30
-                if "90" in decision or "ninety" in decision:
-                    days = 90
-                elif "60" in decision or "sixty" in decision:
-                    days = 60
-                elif "7" in decision or "seven" in decision or "week" in decision:
-                    days = 7
-                
-                if "sales_metrics" not in existing_data:
-                    existing_data["sales_metrics"] = self.tools.get_sales_metrics(days)
-                    logger.info(f"Fetched sales metrics for {days} days")
-            
-            if "trend" in decision or "line" in decision or "time series" in decision or "daily" in decision:
-                days = 30
-                if "90" in decision: days = 90
-                elif "60" in decision: days = 60
-                elif "7" in decision: days = 7
-                
-                if "sales_trend" not in existing_data:
-                    existing_data["sales_trend"] = self.tools.get_sales_trend(days)
-                    logger.info(f"Fetched sales trend for {days} days")
-            
-            if "product" in decision or "top" in decision:
-                limit = 10
-                if "20" in decision or "twenty" in decision:
-                    limit = 20
-                elif "5" in decision or "five" in decision:
-                    limit = 5
-                
-                if "top_products" not in existing_data:
-                    existing_data["top_products"] = self.tools.get_top_products(limit)
-                    logger.info(f"Fetched top {limit} products")
-            
-            if "category" in decision or "categories" in decision or "breakdown" in decision:
-                if "revenue_by_category" not in existing_data:
-                    existing_data["revenue_by_category"] = self.tools.get_revenue_by_category()
-                    logger.info("Fetched revenue by category")
-            
-            if "monthly" in decision or "month" in decision or "comparison" in decision:
-                months = 6
-                if "12" in decision: months = 12
-                elif "3" in decision: months = 3
-                
-                if "monthly_comparison" not in existing_data:
-                    existing_data["monthly_comparison"] = self.tools.get_monthly_comparison(months)
-                    logger.info(f"Fetched monthly comparison for {months} months")
+            if state.get("tool_calls"):
+                # The analyst already picked tools and arguments; run them as-is
+                fetches = self._tool_call_fetches(state["tool_calls"], existing_data, fetched_args)
+            else:
+                fetches = self._route(request_text, existing_data)
             
-            if "customer" in decision and "segment" in decision:
-                if "customer_segments" not in existing_data:
-                    existing_data["customer_segments"] = self.tools.get_customer_segments()
-                    logger.info("Fetched customer segments")
+            # Fall back to the LLM only when no deterministic route matched
+            if not fetches and not state.get("tool_calls"):
+                fetches = self._route(self._llm_data_decision(state, existing_data), existing_data)
             
-            if "lifetime" in decision or "ltv" in decision or "top customer" in decision:
-                limit = 10
-                if "20" in decision: limit = 20
-                elif "5" in decision: limit = 5
-                
-                if "customer_lifetime_value" not in existing_data:
-                    existing_data["customer_lifetime_value"] = self.tools.get_customer_lifetime_value(limit)
-                    logger.info(f"Fetched top {limit} customers by LTV")
+            if fetches:
+                fetched = self._fetch_concurrently(fetches)
+                existing_data.update(fetched)
+                fetched_args.update((key, fetches[key][1]) for key in fetched)
+                logger.info(f"Fetched {', '.join(f'{key}{fetches[key][1]}' for key in fetched)}")
             
             # Default data if nothing fetched
-            if not existing_data and state_dict.get("iteration_count", 0) == 0:
+            if not existing_data and state["iteration_count"] == 0:
                 logger.info("No specific data requested, fetching default dataset with chart data")
-                existing_data = {
-                    "sales_metrics": self.tools.get_sales_metrics(30),
-                    "top_products": self.tools.get_top_products(10),
-                    "sales_trend": self.tools.get_sales_trend(30)
-                }
+                fetched = dict(self.tools.get_default_dataset(30, 10))
+                existing_data = fetched
+                fetched_args = {"sales_metrics": (30,), "top_products": (10,), "sales_trend": (30,)}
             
         except Exception as e:
             logger.error(f"Error in data_extractor: {str(e)}")
             if not existing_data:
-                existing_data = {
-                    "sales_metrics": self.tools.get_sales_metrics(30),
-                    "sales_trend": self.tools.get_sales_trend(30)
-                }
+                fetched = self._fetch_concurrently({
+                    "sales_metrics": (self.tools.get_sales_metrics, (30,)),
+                    "sales_trend": (self.tools.get_sales_trend, (30,))
+                })
+                existing_data = fetched
+                fetched_args = {key: (30,) for key in fetched}
         
         # Return dict updates for LangGraph
         return {
             "data": existing_data,
             "data_requests": [],
-            "iteration_count": state_dict.get("iteration_count", 0) + 1
+            "tool_calls": [],
+            "fetched_args": fetched_args,
+            "new_data": bool(fetched),
+            "iteration_count": state["iteration_count"] + 1
         }
     
+    def _llm_data_decision(self, state: AnalysisState, existing_data: Dict[str, Any]) -> str:
+        """Ask the LLM which data to fetch when the request text matches no route"""
+        if state["data_requests"]:
+            context = f"Additional data requested: {', '.join(state['data_requests'])}"
+        else:
+            context = f"Initial query: {state['query']}"
+        
+        prompt = _EXTRACTOR_TEMPLATE.format(context=context, current_data=list(existing_data.keys()))
+        
+        decision = self._complete(prompt).lower()
+        logger.info(f"Data extractor decision: {decision}")
+        return decision
+    
+    def _route(self, text: str, existing_data: Dict[str, Any]) -> Dict[str, Tuple[Callable[..., Dict[str, Any]], tuple]]:
+        """Map request text to tool calls for the data that has not been fetched yet"""
+        lowered = text.lower()
+        return {
+            data_key: (getattr(self.tools, method_name), parse_args(lowered))
+            for pattern, data_key, method_name, parse_args in _ROUTES
+            if data_key not in existing_data and pattern.search(lowered)
+        }
+    
+    def _tool_call_fetches(self, tool_calls: List[Dict[str, Any]], existing_data: Dict[str, Any],
+                           fetched_args: Dict[str, tuple]) -> Dict[str, Tuple[Callable[..., Dict[str, Any]], tuple]]:
+        """Map analyst tool calls to fetches for data not loaded yet, or loaded with other arguments"""
+        fetches = {}
+        for tool_call in tool_calls:
+            name = tool_call["name"]
+            data_key = _TOOL_DATA_KEYS.get(name)
+            if data_key is None:
+                continue
+            
+            # Positional args in schema order keep cache keys identical to routed calls
+            args = []
+            try:
+                for param in _TOOL_PARAMS[name]:
+                    if param not in tool_call["args"]:
+                        break
+                    args.append(int(tool_call["args"][param]))
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping {name} call with invalid arguments: {tool_call['args']}")
+                continue
+            args = tuple(args)
+            
+            # Loaded data is only re-fetched when the analyst asked for different explicit arguments
+            if data_key in existing_data and (not args or tuple(fetched_args.get(data_key, ())) == args):
+                continue
+            fetches[data_key] = (getattr(self.tools, name), args)
+        return fetches
+    
+    def _fetch_concurrently(self, fetches: Dict[str, Tuple[Callable[..., Dict[str, Any]], tuple]]) -> Dict[str, Any]:
+        """Run independent Snowflake tool calls concurrently and collect results by data key.
+        
+        A failed call is logged and left out, so the calls that succeeded are still kept.
+        """
+        futures = {key: self.executor.submit(func, *args) for key, (func, args) in fetches.items()}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.error(f"Error fetching {key}: {str(e)}")
+        return results
+    
     def analyst(self, state: AnalysisState) -> Dict[str, Any]:
         """Analyze data and determine if more data is needed"""
         print("\n[ANALYST AGENT]")
         
-        state_dict = state.model_dump() if hasattr(state, 'model_dump') else state.dict()
-        data_str = json.dumps(state_dict["data"], indent=2, default=str)
-        
-        prompt = f"""
-        Query: {state_dict["query"]}
-        
-        Available Data Structure:
-        {data_str}
-        
-        IMPORTANT: The data keys are at the top level (e.g., "top_products", "sales_trend", "customer_segments").
-        Do NOT use nested paths like "top_products.top_products" - use only the top-level key name.
-        
-        Your tasks:
-        1. Determine if you have enough data to answer the query
-        2. Provide comprehensive analysis
-        3. Recommend appropriate chart visualizations
-        
-        Available chart types:
-        - line: For trends over time
-        - bar: For vertical comparisons
-        - pie: For proportions/percentages
-        - horizontal_bar: For horizontal ranking comparisons
-        
-        Response format:
-        SUFFICIENT: YES or NO
-        
-        If NO:
-        NEEDED: [specific data points needed]
-        
-        If YES:
-        ANALYSIS: [your comprehensive analysis]
-        CHARTS: [JSON array of chart configs]
-        
-        CRITICAL CHART CONFIG RULES:
-        1. data_key: Use ONLY the top-level key name from the data (e.g., "top_products", NOT "top_products.top_products")
-        2. x_field: ALWAYS the categorical/label field name (e.g., "product_name", "date", "segment")
-        3. y_fields: ALWAYS array of numeric field names (e.g., ["total_revenue"], ["customer_count"])
-        4. For pie charts: use name_field and value_field instead of x_field and y_fields
-        
-        Chart Examples:
-        {{
-            "type": "horizontal_bar",
-            "title": "Top Products by Revenue",
-            "data_key": "top_products",
-            "x_field": "product_name",
-            "y_fields": ["total_revenue"],
-            "description": "Revenue ranking"
-        }}
-        
-        {{
-            "type": "pie",
-            "title": "Revenue by Category",
-            "data_key": "revenue_by_category",
-            "name_field": "category",
-            "value_field": "revenue",
-            "description": "Category distribution"
-        }}
-        """
+        data_str = orjson.dumps(self._summarize_data(state["data"]), default=str).decode()
+        
+        prompt = _ANALYST_TEMPLATE.format(query=state["query"], data=data_str)
         
         try:
-            response = self.llm.invoke(prompt)
-            content = response.content
+            content, tool_calls = self._stream_analysis(prompt)
             
             logger.info(f"Analyst response preview: {content[:200]}...")
             
             updates = {}
+            sections = _split_sections(content)
             
-            if "SUFFICIENT: NO" in content:
+            if tool_calls:
                 updates["needs_more_data"] = True
-                if "NEEDED:" in content:
-                    needed_section = content.split("NEEDED:")[1]
-                    if "ANALYSIS:" in needed_section:
-                        needed_section = needed_section.split("ANALYSIS:")[0]
-                    
+                updates["tool_calls"] = tool_calls
+                updates["data_requests"] = []
+                updates["analysis"] = "Gathering additional data based on analysis needs..."
+                updates["charts"] = []
+                logger.info(f"Analyst requesting more data via tools: {tool_calls}")
+            elif sections.get("SUFFICIENT", "").startswith("NO"):
+                updates["needs_more_data"] = True
+                if "NEEDED" in sections:
                     data_requests = [line.strip().lstrip("- •").strip() 
-                                for line in needed_section.split("\n") 
-                                if line.strip() and not line.startswith("SUFFICIENT")]
+                                for line in sections["NEEDED"].split("\n") 
+                                if line.strip()]
                     updates["data_requests"] = data_requests
                     logger.info(f"Analyst requesting more data: {data_requests}")
                 
@@ -250,19 +483,16 @@ class EcommerceAgents:
             else:
                 updates["needs_more_data"] = False
                 updates["data_requests"] = []
+                updates["tool_calls"] = []
                 
                 # Extract analysis
-                if "ANALYSIS:" in content:
-                    analysis_part = content.split("ANALYSIS:")[1]
-                    if "CHARTS:" in analysis_part:
-                        updates["analysis"] = analysis_part.split("CHARTS:")[0].strip()
-                    else:
-                        updates["analysis"] = analysis_part.strip()
+                if "ANALYSIS" in sections:
+                    updates["analysis"] = sections["ANALYSIS"]
                 else:
                     updates["analysis"] = content.replace("SUFFICIENT: YES", "").strip()
                 
                 # Extract and generate charts
-                updates["charts"] = self._extract_charts(content, state_dict["data"])
+                updates["charts"] = self._extract_charts(sections.get("CHARTS"), state["data"])
                 logger.info(f"Generated {len(updates['charts'])} charts")
             
             return updates
@@ -271,37 +501,102 @@ class EcommerceAgents:
             logger.error(f"Error in analyst: {str(e)}")
             return {
                 "needs_more_data": False,
-                "analysis": f"Analysis based on available data: {list(state_dict['data'].keys())}",
-                "charts": self._generate_default_charts(state_dict["data"])
+                "analysis": f"Analysis based on available data: {list(state['data'].keys())}",
+                "charts": self._generate_default_charts(state["data"])
             }
     
-    def _extract_charts(self, content: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract chart configurations from analyst response"""
+    def _summarize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace each row list with its fields, row count and a bounded sample of rows"""
+        summary = {}
+        for data_key, result in data.items():
+            if not isinstance(result, dict):
+                summary[data_key] = result
+                continue
+            
+            summary[data_key] = {
+                name: {
+                    "row_count": len(value),
+                    "fields": list(value[0].keys()) if value and isinstance(value[0], dict) else [],
+                    "rows": value[:_PROMPT_SAMPLE_ROWS]
+                } if isinstance(value, list) else value
+                for name, value in result.items()
+            }
+        return summary
+    
+    def _complete(self, prompt: str) -> str:
+        """Invoke the LLM, serving repeated prompts from the response cache"""
+        cache = _get_llm_cache()
+        if cache is None:
+            return self.llm.invoke(prompt).content
+        
+        key = _prompt_key(prompt)
+        content = cache.get(key)
+        if content is None:
+            content = self.llm.invoke(prompt).content
+            cache.set(key, content, expire=_LLM_CACHE_TTL)
+        return content
+    
+    def _stream_analysis(self, prompt: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Stream the analyst response and any tool calls, stopping as soon as the CHARTS array is complete"""
+        cache = _get_llm_cache()
+        key = _prompt_key(prompt)
+        
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        content = ""
+        charts_idx = -1
+        tool_message = None
+        
+        for chunk in self.analyst_llm.stream(prompt):
+            if chunk.tool_call_chunks:
+                tool_message = chunk if tool_message is None else tool_message + chunk
+            
+            text = _chunk_text(chunk.content)
+            content += text
+            
+            if charts_idx < 0:
+                # Only the tail can contain a marker that was not there before
+                charts_idx = content.find("CHARTS:", max(0, len(content) - len(text) - len("CHARTS:")))
+            
+            # Nothing after the chart configs is used, so stop reading once they close
+            if charts_idx >= 0 and "]" in text and self._charts_complete(content[charts_idx:]):
+                break
+        
+        tool_calls = [
+            {"name": tool_call["name"], "args": tool_call["args"]}
+            for tool_call in (tool_message.tool_calls if tool_message is not None else [])
+        ]
+        
+        # Replaying a request for more data would just ask for the same data again
+        if cache is not None and not tool_calls and "SUFFICIENT: NO" not in content:
+            cache.set(key, (content, tool_calls), expire=_LLM_CACHE_TTL)
+        return content, tool_calls
+    
+    def _decode_charts(self, charts_section: str) -> List[Dict[str, Any]]:
+        """Decode the JSON array that follows CHARTS:, raising ValueError if it is missing or incomplete"""
+        charts, _ = _JSON_DECODER.raw_decode(charts_section, charts_section.index("["))
+        return charts
+    
+    def _charts_complete(self, charts_section: str) -> bool:
+        """Check whether the CHARTS array has closed into valid JSON"""
+        try:
+            self._decode_charts(charts_section)
+            return True
+        except ValueError:
+            return False
+    
+    def _extract_charts(self, charts_section: Optional[str], data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extract chart configurations from the CHARTS section of the analyst response"""
         charts = []
         
-        if "CHARTS:" in content:
+        if charts_section is not None:
             try:
-                charts_section = content.split("CHARTS:")[1].strip()
-                # Try to parse JSON
-                if "[" in charts_section:
-                    # Extract JSON array
-                    start_idx = charts_section.index("[")
-                    bracket_count = 0
-                    end_idx = start_idx
-                    
-                    for i, char in enumerate(charts_section[start_idx:], start_idx):
-                        if char == "[":
-                            bracket_count += 1
-                        elif char == "]":
-                            bracket_count -= 1
-                            if bracket_count == 0:
-                                end_idx = i + 1
-                                break
-                    
-                    charts_json = charts_section[start_idx:end_idx]
-                    charts = json.loads(charts_json)
-                    logger.info(f"Parsed {len(charts)} charts from analyst response")
-                    return charts
+                charts = self._decode_charts(charts_section)
+                logger.info(f"Parsed {len(charts)} charts from analyst response")
+                return charts
             except Exception as e:
                 logger.warning(f"Failed to parse charts from response: {str(e)}")
         
@@ -311,72 +606,17 @@ class EcommerceAgents:
     
     def _generate_default_charts(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate default chart configurations based on available data"""
-        charts = []
+        # Each result dict holds its rows under the same key it is stored under in data
+        present_keys = {key for key, value in data.items() if isinstance(value, dict) and value.get(key)}
+        charts = [dict(chart) for data_key, chart in _DEFAULT_CHARTS if data_key in present_keys]
         
-        # Line chart for sales trend
-        if "sales_trend" in data and data["sales_trend"].get("sales_trend"):
-            charts.append({
-                "type": "line",
-                "title": "Sales Trend Over Time",
-                "data_key": "sales_trend",
-                "x_field": "date",
-                "y_fields": ["revenue"],
-                "description": "Daily revenue trend"
-            })
-            logger.info("Added sales trend line chart")
-        
-        # Bar chart for top products
-        if "top_products" in data and data["top_products"].get("top_products"):
-            charts.append({
-                "type": "horizontal_bar",
-                "title": "Top Products by Revenue",
-                "data_key": "top_products",
-                "x_field": "product_name",
-                "y_fields": ["total_revenue"],
-                "description": "Product performance comparison"
-            })
-            logger.info("Added top products bar chart")
-        
-        # Pie chart for revenue by category
-        if "revenue_by_category" in data and data["revenue_by_category"].get("revenue_by_category"):
-            charts.append({
-                "type": "pie",
-                "title": "Revenue Distribution by Category",
-                "data_key": "revenue_by_category",
-                "name_field": "category",
-                "value_field": "revenue",
-                "description": "Category revenue breakdown"
-            })
-            logger.info("Added revenue by category pie chart")
-        
-        # Bar chart for monthly comparison
-        if "monthly_comparison" in data and data["monthly_comparison"].get("monthly_comparison"):
-            charts.append({
-                "type": "bar",
-                "title": "Monthly Revenue Comparison",
-                "data_key": "monthly_comparison",
-                "x_field": "month",
-                "y_fields": ["revenue"],
-                "description": "Month-over-month revenue performance"
-            })
-            logger.info("Added monthly comparison bar chart")
-        
-        # Horizontal bar for customer segments
-        if "customer_segments" in data and data["customer_segments"].get("customer_segments"):
-            charts.append({
-                "type": "horizontal_bar",
-                "title": "Customer Segments Distribution",
-                "data_key": "customer_segments",
-                "x_field": "segment",
-                "y_fields": ["customer_count"],
-                "description": "Customer distribution across segments"
-            })
-            logger.info("Added customer segments horizontal bar chart")
+        for chart in charts:
+            logger.info(f"Added {chart['data_key']} {chart['type']} chart")
         
         print("=" * 50)
         print("CHARTS BEING RETURNED:")
         for chart in charts:
-            print(json.dumps(chart, indent=2))
+            print(orjson.dumps(chart, option=orjson.OPT_INDENT_2).decode())
         print("=" * 50)
         return charts
     
@@ -384,44 +624,28 @@ class EcommerceAgents:
         """Generate actionable recommendations"""
         print("\n[CONSULTANT AGENT]")
         
-        state_dict = state.model_dump() if hasattr(state, 'model_dump') else state.dict()
-        
-        prompt = f"""
-        Original Query: {state_dict["query"]}
-        
-        Analysis:
-        {state_dict["analysis"]}
-        
-        Based on this analysis, provide 3-5 actionable business recommendations.
-        
-        Format your response as:
-        1. [Recommendation]: [Specific action with expected impact]
-        2. [Recommendation]: [Specific action with expected impact]
-        3. [Recommendation]: [Specific action with expected impact]
-        
-        Focus on:
-        - Practical, implementable actions
-        - Expected business impact
-        - Specific metrics to improve
-        """
+        prompt = _CONSULTANT_TEMPLATE.format(query=state["query"], analysis=state["analysis"])
         
         try:
-            response = self.llm.invoke(prompt)
+            recommendations = self._complete(prompt)
             logger.info("Consultant provided recommendations")
-            return {"recommendations": response.content}
+            return {"recommendations": recommendations}
         except Exception as e:
             logger.error(f"Error in consultant: {str(e)}")
             return {"recommendations": "Unable to generate recommendations. Please review the analysis."}
     
     def should_continue(self, state: AnalysisState) -> str:
         """Decide whether to fetch more data or proceed to consultant"""
-        state_dict = state.model_dump() if hasattr(state, 'model_dump') else state.dict()
-        
-        if state_dict.get("iteration_count", 0) > 3:
+        if state["iteration_count"] > 3:
             logger.warning("Max iterations reached, proceeding to consultant")
             return "consultant"
         
-        if state_dict.get("needs_more_data") and len(state_dict.get("data_requests", [])) > 0:
+        # Another analyst pass over unchanged data would only repeat the same request
+        if not state.get("new_data", True):
+            logger.info("Data extractor found no new data, proceeding to consultant")
+            return "consultant"
+        
+        if state["needs_more_data"] and (state["data_requests"] or state.get("tool_calls")):
             logger.info("Analyst requested more data, returning to extractor")
             return "data_extractor"
         
@@ -429,7 +653,11 @@ class EcommerceAgents:
         return "consultant"
     
     def _build_graph(self):
-        """Build the workflow graph"""
+        """Build the workflow graph without and with a checkpointer.
+        
+        Checkpointing only matters for threads that are resumed, so one-shot runs use the
+        plain graph and skip saving state after every node.
+        """
         workflow = StateGraph(AnalysisState)
         
         workflow.add_node("data_extractor", self.data_extractor)
@@ -450,35 +678,36 @@ class EcommerceAgents:
         
         workflow.add_edge("consultant", END)
         
-        return workflow.compile(checkpointer=self.memory)
+        return workflow.compile(), workflow.compile(checkpointer=self.memory)
     
     def analyze(self, query: str, thread_id: str = "default") -> Dict[str, Any]:
         """Main entry point for analysis"""
         config = {"configurable": {"thread_id": thread_id}}
         
-        initial_state = AnalysisState(
-            query=query,
-            data={},
-            analysis="",
-            recommendations="",
-            charts=[],
-            needs_more_data=False,
-            data_requests=[],
-            iteration_count=0
-        )
+        initial_state: AnalysisState = {
+            "query": query,
+            "data": {},
+            "analysis": "",
+            "recommendations": "",
+            "charts": [],
+            "needs_more_data": False,
+            "data_requests": [],
+            "tool_calls": [],
+            "fetched_args": {},
+            "iteration_count": 0
+        }
         
         logger.info(f"Starting analysis for query: {query}")
         
-        result = self.graph.invoke(initial_state, config=config)
-        
-        result_dict = result.model_dump() if hasattr(result, 'model_dump') else result
+        graph = self.checkpointed_graph if thread_id != "default" else self.graph
+        result = graph.invoke(initial_state, config=config)
         
-        logger.info(f"Analysis complete. Iterations: {result_dict.get('iteration_count', 0)}, Charts: {len(result_dict.get('charts', []))}")
+        logger.info(f"Analysis complete. Iterations: {result.get('iteration_count', 0)}, Charts: {len(result.get('charts', []))}")
         
         return {
-            "query": result_dict["query"],
-            "data": result_dict["data"],
-            "analysis": result_dict["analysis"],
-            "recommendations": result_dict["recommendations"],
-            "charts": result_dict.get("charts", [])
+            "query": result["query"],
+            "data": result["data"],
+            "analysis": result["analysis"],
+            "recommendations": result["recommendations"],
+            "charts": result.get("charts", [])
         }
\ No newline at end of file
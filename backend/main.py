@@ -6,6 +6,7 @@ from langgraph_agents import EcommerceAgents
 from tool_snowflake import SnowflakeTools
 import uvicorn
 import asyncio
+import os
 from concurrent.futures import ThreadPoolExecutor
 
 app = FastAPI(title="E-commerce AI Agents API")
@@ -20,7 +21,13 @@ app.add_middleware(
 
 agents = EcommerceAgents()
 tools = SnowflakeTools()
-executor = ThreadPoolExecutor(max_workers=4)
+# Endpoint work is IO-bound (Snowflake + Anthropic), so the pool is sized for concurrency, not cores
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("WORKER_THREADS", "32")),
+    thread_name_prefix="ecom-io"
+)
+# Backpressure for the LLM-heavy analysis endpoint; excess requests wait instead of piling onto the pool
+analyze_semaphore = asyncio.Semaphore(int(os.getenv("ANALYZE_CONCURRENCY", "8")))
 
 class AnalysisRequest(BaseModel):
     query: str
@@ -36,31 +43,30 @@ async def health_check():
 
 @app.get("/quick-insights")
 async def get_quick_insights():
-    def get_insights():
-        sales = tools.get_sales_metrics(30)
-        products = tools.get_top_products(3)
-        segments = tools.get_customer_segments()
-        
-        return [
-            QuickInsight(
-                metric="Total Revenue (30 days)",
-                value=f"${sales['total_revenue']:,.2f}",
-                trend=f"{sales['total_orders']} orders"
-            ),
-            QuickInsight(
-                metric="Top Product",
-                value=products['top_products'][0]['product_name'] if products['top_products'] else "N/A",
-                trend=f"${products['top_products'][0]['total_revenue']:,.2f}" if products['top_products'] else "N/A"
-            ),
-            QuickInsight(
-                metric="Active Customers",
-                value=str(sum(seg['customer_count'] for seg in segments['customer_segments'])),
-                trend="Across all segments"
-            )
-        ]
-    
     loop = asyncio.get_event_loop()
-    insights = await loop.run_in_executor(executor, get_insights)
+    sales, products, segments = await asyncio.gather(
+        loop.run_in_executor(executor, tools.get_sales_metrics, 30),
+        loop.run_in_executor(executor, tools.get_top_products, 3),
+        loop.run_in_executor(executor, tools.get_customer_segments)
+    )
+    
+    insights = [
+        QuickInsight(
+            metric="Total Revenue (30 days)",
+            value=f"${sales['total_revenue']:,.2f}",
+            trend=f"{sales['total_orders']} orders"
+        ),
+        QuickInsight(
+            metric="Top Product",
+            value=products['top_products'][0]['product_name'] if products['top_products'] else "N/A",
+            trend=f"${products['top_products'][0]['total_revenue']:,.2f}" if products['top_products'] else "N/A"
+        ),
+        QuickInsight(
+            metric="Active Customers",
+            value=str(sum(seg['customer_count'] for seg in segments['customer_segments'])),
+            trend="Across all segments"
+        )
+    ]
     return {"insights": insights}
 
 @app.post("/analyze")
@@ -69,7 +75,8 @@ async def analyze_data(request: AnalysisRequest):
         return agents.analyze(request.query)
     
     loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(executor, run_analysis)
+    async with analyze_semaphore:
+        result = await loop.run_in_executor(executor, run_analysis)
     
     print(f"DEBUG: Charts in result: {result.get('charts', [])}")
     
@@ -0,0 +1,42 @@
+-- Persist the product category that get_revenue_by_category groups by, so the
+-- query no longer evaluates five LIKE patterns per order item on every call.
+-- Run once against the schema in SNOWFLAKE_RAW_SCHEMA.
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS category STRING;
+
+UPDATE products
+SET category = CASE
+    WHEN product_name LIKE '%Pro%' THEN 'Pro'
+    WHEN product_name LIKE '%Premium%' THEN 'Premium'
+    WHEN product_name LIKE '%Standard%' THEN 'Standard'
+    WHEN product_name LIKE '%Lite%' THEN 'Lite'
+    WHEN product_name LIKE '%Ultra%' THEN 'Ultra'
+    ELSE 'Other'
+END
+WHERE category IS NULL;
+
+-- Keep new products categorized as the pipeline loads them
+CREATE STREAM IF NOT EXISTS products_category_stream ON TABLE products;
+
+-- Replace COMPUTE_WH with the warehouse in SNOWFLAKE_WAREHOUSE
+CREATE OR REPLACE TASK products_category_refresh
+    WAREHOUSE = COMPUTE_WH
+    SCHEDULE = '60 MINUTE'
+WHEN SYSTEM$STREAM_HAS_DATA('products_category_stream')
+AS
+UPDATE products
+SET category = CASE
+    WHEN product_name LIKE '%Pro%' THEN 'Pro'
+    WHEN product_name LIKE '%Premium%' THEN 'Premium'
+    WHEN product_name LIKE '%Standard%' THEN 'Standard'
+    WHEN product_name LIKE '%Lite%' THEN 'Lite'
+    WHEN product_name LIKE '%Ultra%' THEN 'Ultra'
+    ELSE 'Other'
+END
+WHERE product_id IN (
+    SELECT product_id FROM products_category_stream
+    WHERE METADATA$ACTION = 'INSERT'
+)
+AND category IS NULL;
+
+ALTER TASK products_category_refresh RESUME;
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+# Add parent directory (backend) to path to import modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from langgraph_agents import _split_sections
+
+def test_marker_inside_analysis_does_not_end_it():
+    sections = _split_sections("ANALYSIS: Revenue is up. NEEDED: nothing\nCHARTS: []")
+    assert sections["ANALYSIS"] == "Revenue is up. NEEDED: nothing"
+    assert sections["CHARTS"] == "[]"
+
+def test_needed_runs_to_analysis():
+    sections = _split_sections("SUFFICIENT: NO\nNEEDED:\n- daily trend\n- top products\nANALYSIS: Partial view")
+    assert sections["SUFFICIENT"] == "NO"
+    assert sections["NEEDED"] == "- daily trend\n- top products"
+    assert sections["ANALYSIS"] == "Partial view"
+
+def test_needed_runs_to_charts():
+    sections = _split_sections("SUFFICIENT: NO\nNEEDED: category breakdown\nCHARTS: []")
+    assert sections["NEEDED"] == "category breakdown"
+
+def test_charts_run_to_end():
+    sections = _split_sections('ANALYSIS: ok\nCHARTS: [{"title": "ANALYSIS: by day"}]')
+    assert sections["ANALYSIS"] == "ok"
+    assert sections["CHARTS"] == '[{"title": "ANALYSIS: by day"}]'
+
+def test_first_occurrence_wins():
+    sections = _split_sections("ANALYSIS: first\nCHARTS: []\nANALYSIS: second")
+    assert sections["ANALYSIS"] == "first"
+
+def test_missing_markers():
+    assert _split_sections("no markers here") == {}
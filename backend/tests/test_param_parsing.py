@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+# Add parent directory (backend) to path to import modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from langgraph_agents import _parse_days, _parse_limit, _parse_months
+
+def test_defaults_without_a_number():
+    assert _parse_days("show me revenue") == (30,)
+    assert _parse_limit("top products") == (10,)
+    assert _parse_months("monthly comparison") == (6,)
+
+def test_digits_and_words():
+    assert _parse_days("revenue for the last 90 days") == (90,)
+    assert _parse_days("sixty days of sales") == (60,)
+    assert _parse_days("sales this week") == (7,)
+    assert _parse_limit("top 5 products") == (5,)
+    assert _parse_limit("top twenty products") == (20,)
+    assert _parse_months("last 12 months") == (12,)
+    assert _parse_months("three months") == (3,)
+
+def test_year_is_not_read_as_a_number():
+    assert _parse_limit("top products in 2024") == (10,)
+    assert _parse_days("sales since 2060") == (30,)
+
+def test_number_must_not_continue_either_side():
+    assert _parse_days("sales over 17 days") == (30,)
+    assert _parse_days("sales over 70 days") == (30,)
+    assert _parse_limit("top 15 products") == (10,)
+    assert _parse_months("last 13 months") == (6,)
+
+def test_leftmost_value_wins():
+    assert _parse_days("7 days compared with 90 days") == (7,)
+    assert _parse_days("90 days compared with 7 days") == (90,)
+    assert _parse_limit("top 5 of the 20 best sellers") == (5,)
+
+def test_plural_and_suffixed_words():
+    assert _parse_days("last few weeks") == (7,)
+    assert _parse_months("twelve-month view") == (12,)
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+# Add parent directory (backend) to path to import modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from langgraph_agents import EcommerceAgents
+
+class RecordingTools:
+    """Stands in for SnowflakeTools; _route only looks the methods up"""
+    def __getattr__(self, name):
+        return name
+
+def make_agents():
+    # Skip __init__ so no Snowflake or Anthropic client is created
+    agents = EcommerceAgents.__new__(EcommerceAgents)
+    agents.tools = RecordingTools()
+    return agents
+
+def routed(text, existing_data=None):
+    fetches = make_agents()._route(text, existing_data or {})
+    return {key: (method, args) for key, (method, args) in fetches.items()}
+
+def test_routes_with_parsed_arguments():
+    assert routed("Revenue over the last 90 days") == {
+        "sales_metrics": ("get_sales_metrics", (90,)),
+    }
+    assert routed("top 5 products") == {
+        "top_products": ("get_top_products", (5,)),
+    }
+
+def test_plurals_and_case():
+    assert set(routed("Product CATEGORIES and monthly trends")) == {
+        "top_products", "revenue_by_category", "monthly_comparison", "sales_trend",
+    }
+
+def test_tool_names_from_llm_output():
+    fetches = routed("get_sales_trend, get_customer_segments")
+    assert set(fetches) == {"sales_trend", "customer_segments", "sales_metrics"}
+
+def test_customer_segments_needs_both_words():
+    assert "customer_segments" in routed("segment our customers")
+    assert "customer_segments" not in routed("customer count")
+
+def test_lifetime_value():
+    assert routed("customer lifetime value for 20 customers") == {
+        "customer_lifetime_value": ("get_customer_lifetime_value", (20,)),
+    }
+
+def test_no_match_on_word_suffixes():
+    # "top" and "line" only match at the start of a word
+    assert routed("stop the pipeline") == {}
+
+def test_already_fetched_data_is_skipped():
+    assert routed("sales trend", {"sales_trend": {}}) == {
+        "sales_metrics": ("get_sales_metrics", (30,)),
+    }
+
+def tool_call_fetches(tool_calls, existing_data, fetched_args):
+    fetches = make_agents()._tool_call_fetches(tool_calls, existing_data, fetched_args)
+    return {key: (method, args) for key, (method, args) in fetches.items()}
+
+def test_tool_call_refetches_with_different_arguments():
+    calls = [{"name": "get_sales_trend", "args": {"days": 90}}]
+    assert tool_call_fetches(calls, {"sales_trend": {}}, {"sales_trend": (30,)}) == {
+        "sales_trend": ("get_sales_trend", (90,)),
+    }
+
+def test_tool_call_skips_data_loaded_with_same_or_default_arguments():
+    existing = {"sales_trend": {}}
+    assert tool_call_fetches([{"name": "get_sales_trend", "args": {"days": 30}}], existing, {"sales_trend": (30,)}) == {}
+    assert tool_call_fetches([{"name": "get_sales_trend", "args": {}}], existing, {"sales_trend": (30,)}) == {}
+
+def test_tool_call_with_bad_arguments_is_skipped_alone():
+    calls = [
+        {"name": "get_top_products", "args": {"limit": "lots"}},
+        {"name": "get_monthly_comparison", "args": {"months": "12"}},
+    ]
+    assert tool_call_fetches(calls, {}, {}) == {
+        "monthly_comparison": ("get_monthly_comparison", (12,)),
+    }
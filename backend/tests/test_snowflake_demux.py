@@ -0,0 +1,148 @@
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add parent directory (backend) to path to import modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pyarrow as pa
+import pytest
+
+import tool_snowflake as ts
+
+def money(values):
+    return pa.array([None if v is None else Decimal(str(v)) for v in values], pa.decimal128(38, 2))
+
+def ints(values):
+    return pa.array(values, pa.int64())
+
+def strings(values):
+    return pa.array(values, pa.string())
+
+# Result tables as Snowflake returns them: upper-case names, NUMBER columns as decimals
+RESULTS = {
+    ts._SQL_SALES_METRICS: lambda: pa.table({
+        "TOTAL_ORDERS": ints([3]), "TOTAL_REVENUE": money([10.5]),
+        "AVG_ORDER_VALUE": money([3.5]), "UNIQUE_CUSTOMERS": ints([2]),
+    }),
+    ts._SQL_TOP_PRODUCTS: lambda: pa.table({
+        "PRODUCT_NAME": strings(["A Pro", "B Lite"]), "TOTAL_SOLD": ints([4, 2]),
+        "TOTAL_REVENUE": money([20, 5]), "ORDERS_COUNT": ints([3, 1]),
+    }),
+    ts._SQL_SALES_TREND: lambda: pa.table({
+        "DATE": strings(["2024-01-01", "2024-01-02"]), "REVENUE": money([5, 5.5]), "ORDERS": ints([1, 2]),
+    }),
+    ts._SQL_CUSTOMER_SEGMENTS: lambda: pa.table({
+        "SEGMENT": strings(["High Value"]), "CUSTOMER_COUNT": ints([2]), "AVG_INCOME": money([90000]),
+    }),
+    ts._SQL_REVENUE_BY_CATEGORY: lambda: pa.table({
+        "CATEGORY": strings(["Pro"]), "REVENUE": money([20]), "ORDERS": ints([3]),
+    }),
+    ts._SQL_MONTHLY_COMPARISON: lambda: pa.table({
+        "MONTH": strings(["2024-01"]), "REVENUE": money([20]), "ORDERS": ints([3]), "AVG_ORDER_VALUE": money([6.67]),
+    }),
+    ts._SQL_CUSTOMER_LIFETIME_VALUE: lambda: pa.table({
+        "CUSTOMER_ID": ints([7]), "CUSTOMER_NAME": strings(["Ann Lee"]), "TOTAL_ORDERS": ints([2]),
+        "LIFETIME_VALUE": money([30]), "AVG_ORDER_VALUE": money([15]),
+    }),
+    # The same figures, tagged by section and packed into the shared UNION ALL columns
+    ts._SQL_DEFAULT_DATASET: lambda: pa.table({
+        "SECTION": strings(["sales_metrics", "sales_trend", "sales_trend", "top_products", "top_products"]),
+        "LABEL": strings([None, "2024-01-01", "2024-01-02", "A Pro", "B Lite"]),
+        "ROW_NUM": ints([0, 1, 2, 1, 2]),
+        "ORDERS": ints([3, 1, 2, 3, 1]),
+        "REVENUE": money([10.5, 5, 5.5, 20, 5]),
+        "AVG_ORDER_VALUE": money([3.5, None, None, None, None]),
+        "UNITS": ints([2, None, None, 4, 2]),
+    }),
+}
+
+class FakeCursor:
+    """Serves RESULTS by SQL text, one result set per statement like a multi-statement request"""
+    def __init__(self, executed):
+        self.executed = executed
+        self.pending = []
+    
+    def execute(self, query, params=None, num_statements=None):
+        statements = query.split(";\n") if num_statements else [query]
+        self.executed.append((len(statements), params))
+        self.pending = [RESULTS[next(sql for sql in RESULTS if sql.strip() == s.strip())]() for s in statements]
+        self.current = self.pending.pop(0)
+    
+    def nextset(self):
+        if not self.pending:
+            return None
+        self.current = self.pending.pop(0)
+        return self
+    
+    def fetch_arrow_all(self):
+        return self.current
+    
+    def fetch_arrow_batches(self):
+        # The connector yields each batch as a Table
+        for offset in range(self.current.num_rows):
+            yield self.current.slice(offset, 1)
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+    
+    def cursor(self):
+        return FakeCursor(self.executed)
+    
+    def is_closed(self):
+        return False
+
+@pytest.fixture
+def tools():
+    ts.clear_cache()
+    tools = ts.SnowflakeTools(pool_size=1)
+    tools._pool.get()
+    tools.fake = FakeConnection()
+    tools._pool.put(tools.fake)
+    yield tools
+    ts.clear_cache()
+
+def test_default_dataset_matches_single_section_methods(tools):
+    dataset = tools.get_default_dataset(30, 10)
+    ts.clear_cache()
+    
+    assert dataset == {
+        "sales_metrics": tools.get_sales_metrics(30),
+        "top_products": tools.get_top_products(10),
+        "sales_trend": tools.get_sales_trend(30),
+    }
+    assert dataset["sales_metrics"] == {
+        "period_days": 30, "total_orders": 3, "total_revenue": 10.5,
+        "avg_order_value": 3.5, "unique_customers": 2,
+    }
+    assert dataset["top_products"]["top_products"][0] == {
+        "product_name": "A Pro", "total_sold": 4, "total_revenue": 20.0, "orders_count": 3,
+    }
+
+def test_dashboard_demuxes_one_result_set_per_statement(tools):
+    dashboard = tools.get_dashboard(days=30, months=6, limit=10)
+    assert tools.fake.executed == [(7, (30, 10, 30, 6, 10))]
+    ts.clear_cache()
+    
+    assert dashboard == {
+        "sales_metrics": tools.get_sales_metrics(30),
+        "top_products": tools.get_top_products(10),
+        "customer_segments": tools.get_customer_segments(),
+        "sales_trend": tools.get_sales_trend(30),
+        "revenue_by_category": tools.get_revenue_by_category(),
+        "monthly_comparison": tools.get_monthly_comparison(6),
+        "customer_lifetime_value": tools.get_customer_lifetime_value(10),
+    }
+
+def test_dashboard_only_sends_sections_missing_from_the_cache(tools):
+    tools.get_top_products(10)
+    tools.get_sales_trend(30)
+    tools.fake.executed.clear()
+    
+    dashboard = tools.get_dashboard(days=30, months=6, limit=10)
+    assert tools.fake.executed == [(5, (30, 6, 10))]
+    assert dashboard["sales_trend"] == tools.get_sales_trend(30)
+    assert len(tools.fake.executed) == 1
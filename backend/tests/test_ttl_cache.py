@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory (backend) to path to import modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+
+import tool_snowflake
+from tool_snowflake import clear_cache, ttl_cached
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_snowflake, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    clear_cache()
+    return now
+
+class Queries:
+    def __init__(self):
+        self.calls = []
+    
+    @ttl_cached(ttl=60, maxsize=2)
+    def get_trend(self, days: int = 30):
+        self.calls.append(days)
+        return {"days": days}
+
+def test_default_positional_and_keyword_arguments_share_an_entry(clock):
+    queries = Queries()
+    first = queries.get_trend()
+    assert queries.get_trend(30) is first
+    assert queries.get_trend(days=30) is first
+    assert queries.calls == [30]
+
+def test_cache_is_shared_across_instances(clock):
+    first, second = Queries(), Queries()
+    first.get_trend(7)
+    second.get_trend(7)
+    assert first.calls == [7]
+    assert second.calls == []
+
+def test_entries_expire_after_ttl(clock):
+    queries = Queries()
+    queries.get_trend(90)
+    clock[0] += 59
+    queries.get_trend(90)
+    assert queries.calls == [90]
+    clock[0] += 2
+    queries.get_trend(90)
+    assert queries.calls == [90, 90]
+
+def test_least_recently_used_entry_is_evicted(clock):
+    queries = Queries()
+    queries.get_trend(1)
+    queries.get_trend(2)
+    queries.get_trend(1)  # touch 1 so 2 becomes least recently used
+    queries.get_trend(3)
+    assert list(Queries.get_trend.cache) == [(1,), (3,)]
+    queries.get_trend(2)
+    assert queries.calls == [1, 2, 3, 2]
+
+def test_lookup_and_store(clock):
+    queries = Queries()
+    assert Queries.get_trend.lookup(days=14) is None
+    Queries.get_trend.store({"days": 14, "batched": True}, 14)
+    assert queries.get_trend(14) == {"days": 14, "batched": True}
+    assert queries.calls == []
+    clock[0] += 61
+    assert Queries.get_trend.lookup(14) is None
+
+def test_clear_cache(clock):
+    queries = Queries()
+    queries.get_trend(5)
+    clear_cache()
+    assert len(Queries.get_trend.cache) == 0
+    queries.get_trend(5)
+    assert queries.calls == [5, 5]
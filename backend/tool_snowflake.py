@@ -1,16 +1,288 @@
 import json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import snowflake.connector
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
+import functools
+import inspect
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
+# Every ttl_cached query method; their caches are shared by all SnowflakeTools
+# instances so the agents and the /quick-insights endpoint reuse each other's
+# recent queries
+_CACHED_QUERIES = []
+
+# Seconds to wait for a free pooled connection before giving up
+_POOL_TIMEOUT = 120
+
+_SQL_SALES_METRICS = """
+SELECT 
+    COUNT(*) as total_orders,
+    SUM(total_amount) as total_revenue,
+    AVG(total_amount) as avg_order_value,
+    COUNT(DISTINCT customer_id) as unique_customers
+FROM orders 
+WHERE order_date >= DATEADD(day, -?, CURRENT_TIMESTAMP()) AND order_date <= CURRENT_TIMESTAMP()
+"""
+
+_SQL_TOP_PRODUCTS = """
+SELECT 
+    p.product_name,
+    SUM(oi.quantity) as total_sold,
+    SUM(oi.total_price) as total_revenue,
+    APPROX_COUNT_DISTINCT(oi.order_id) as orders_count
+FROM order_items oi
+JOIN products p ON oi.product_id = p.product_id
+GROUP BY p.product_id, p.product_name
+ORDER BY total_revenue DESC
+LIMIT ?
+"""
+
+_SQL_CUSTOMER_SEGMENTS = """
+SELECT 
+    segment,
+    COUNT(*) as customer_count,
+    AVG(annual_income) as avg_income
+FROM customers_seg
+WHERE is_active = TRUE
+GROUP BY segment
+ORDER BY avg_income DESC
+"""
+
+_SQL_SALES_TREND = """
+SELECT 
+    TO_VARCHAR(DATE(order_date), 'YYYY-MM-DD') as date,
+    SUM(total_amount) as revenue,
+    COUNT(*) as orders
+FROM orders 
+WHERE order_date >= DATEADD(day, -?, CURRENT_TIMESTAMP()) AND order_date <= CURRENT_TIMESTAMP()
+GROUP BY DATE(order_date)
+ORDER BY date
+"""
+
+_SQL_REVENUE_BY_CATEGORY = """
+SELECT 
+    COALESCE(p.category, 'Other') as category,
+    SUM(oi.total_price) as revenue,
+    APPROX_COUNT_DISTINCT(oi.order_id) as orders
+FROM order_items oi
+JOIN products p ON oi.product_id = p.product_id
+GROUP BY COALESCE(p.category, 'Other')
+ORDER BY revenue DESC
+"""
+
+_SQL_MONTHLY_COMPARISON = """
+SELECT 
+    YEAR(order_date::DATE) || '-' || LPAD(MONTH(order_date::DATE), 2, '0') as month,
+    SUM(total_amount) as revenue,
+    COUNT(*) as orders,
+    AVG(total_amount) as avg_order_value
+FROM orders 
+WHERE order_date::DATE >= DATEADD(month, -?, CURRENT_DATE())
+GROUP BY YEAR(order_date::DATE), MONTH(order_date::DATE)
+ORDER BY YEAR(order_date::DATE), MONTH(order_date::DATE)
+"""
+
+_SQL_CUSTOMER_LIFETIME_VALUE = """
+SELECT 
+    c.customer_id,
+    CONCAT(c.first_name, ' ', c.last_name) as customer_name,
+    COUNT(DISTINCT o.order_id) as total_orders,
+    SUM(o.total_amount) as lifetime_value,
+    AVG(o.total_amount) as avg_order_value
+FROM customers c
+JOIN orders o ON c.customer_id = o.customer_id
+GROUP BY c.customer_id, customer_name
+ORDER BY lifetime_value DESC
+LIMIT ?
+"""
+
+# Combined result for get_default_dataset, each row tagged with its section
+_SQL_DEFAULT_DATASET = """
+WITH base AS (
+    SELECT order_date, total_amount, customer_id
+    FROM orders 
+    WHERE order_date >= DATEADD(day, -?, CURRENT_TIMESTAMP()) AND order_date <= CURRENT_TIMESTAMP()
+),
+top_products AS (
+    SELECT 
+        p.product_name,
+        SUM(oi.quantity) as total_sold,
+        SUM(oi.total_price) as total_revenue,
+        APPROX_COUNT_DISTINCT(oi.order_id) as orders_count,
+        ROW_NUMBER() OVER (ORDER BY SUM(oi.total_price) DESC) as row_num
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.product_id
+    GROUP BY p.product_id, p.product_name
+    QUALIFY row_num <= ?
+)
+SELECT 'sales_metrics' as section, NULL as label, 0 as row_num,
+    COUNT(*) as orders, SUM(total_amount) as revenue,
+    AVG(total_amount) as avg_order_value, COUNT(DISTINCT customer_id) as units
+FROM base
+UNION ALL
+SELECT 'sales_trend', TO_VARCHAR(DATE(order_date), 'YYYY-MM-DD'),
+    ROW_NUMBER() OVER (ORDER BY DATE(order_date)),
+    COUNT(*), SUM(total_amount), NULL, NULL
+FROM base
+GROUP BY DATE(order_date)
+UNION ALL
+SELECT 'top_products', product_name, row_num, orders_count, total_revenue, NULL, total_sold
+FROM top_products
+ORDER BY section, row_num
+"""
+
+# Output types of the queries served as Arrow tables, in select-list order
+_SALES_TREND_SCHEMA = pa.schema([
+    ("date", pa.string()),
+    ("revenue", pa.float64()),
+    ("orders", pa.int64()),
+])
+
+_TOP_PRODUCTS_SCHEMA = pa.schema([
+    ("product_name", pa.string()),
+    ("total_sold", pa.int64()),
+    ("total_revenue", pa.float64()),
+    ("orders_count", pa.int64()),
+])
+
+_CUSTOMER_LIFETIME_VALUE_SCHEMA = pa.schema([
+    ("customer_id", pa.int64()),
+    ("customer_name", pa.string()),
+    ("total_orders", pa.int64()),
+    ("lifetime_value", pa.float64()),
+    ("avg_order_value", pa.float64()),
+])
+
+def _normalize(table: pa.Table) -> pa.Table:
+    """Lower-case column names and cast decimals to float64 and dates to ISO strings"""
+    columns = []
+    for column in table.columns:
+        if pa.types.is_decimal(column.type):
+            column = column.cast(pa.float64())
+        elif pa.types.is_date(column.type):
+            column = column.cast(pa.string())
+        columns.append(column)
+    return pa.Table.from_arrays(columns, names=[name.lower() for name in table.column_names])
+
+def _to_records(table: pa.Table) -> List[Dict[str, Any]]:
+    """Convert an Arrow result table into JSON-ready rows keyed by lower-case column name"""
+    return _normalize(table).to_pylist()
+
+def _fetch_records(cursor) -> List[Dict[str, Any]]:
+    """Fetch the whole result set through Arrow; the connector returns None for an empty result"""
+    table = cursor.fetch_arrow_all()
+    return _to_records(table) if table is not None else []
+
+def _cast(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Rename a result's upper-case columns and cast them to `schema` in one step"""
+    return table.rename_columns(schema.names).cast(schema)
+
+def _fetch_table(cursor, schema: pa.Schema) -> pa.Table:
+    """Collect a result's Arrow batches cast to `schema`; an empty result gives an empty table"""
+    tables = [_cast(batch, schema) for batch in cursor.fetch_arrow_batches()]
+    return pa.concat_tables(tables) if tables else schema.empty_table()
+
+def to_ipc_bytes(table: pa.Table) -> bytes:
+    """Serialize an Arrow table to the IPC stream format for callers that ship it over the wire"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _sales_metrics(days: int, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape the single aggregate row of _SQL_SALES_METRICS"""
+    result = rows[0]
+    return {
+        "period_days": days,
+        "total_orders": result["total_orders"] or 0,
+        "total_revenue": float(result["total_revenue"] or 0),
+        "avg_order_value": float(result["avg_order_value"] or 0),
+        "unique_customers": result["unique_customers"] or 0
+    }
+
+def _section(table: pa.Table, name: str, columns: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Rows of one tagged section of a combined result, with columns renamed to their output keys"""
+    rows = table.filter(pc.equal(table["section"], name))
+    return rows.select(list(columns)).rename_columns(list(columns.values())).to_pylist()
+
+def ttl_cached(ttl: float, maxsize: int = 128):
+    """Memoize a query method by its arguments for `ttl` seconds, evicting least recently used entries.
+    
+    Every caller gets the same cached object, so results must be treated as read-only.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache = OrderedDict()
+        lock = threading.Lock()
+        
+        def key_for(args, kwargs):
+            bound = signature.bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            return bound.args[1:] + tuple(sorted(bound.kwargs.items()))
+        
+        def lookup(*args, **kwargs):
+            """Return the fresh cached result for these arguments, or None"""
+            key = key_for(args, kwargs)
+            with lock:
+                entry = cache.get(key)
+                if entry is None or entry[0] <= time.monotonic():
+                    return None
+                cache.move_to_end(key)
+                return entry[1]
+        
+        def store(value, *args, **kwargs):
+            """Cache a result for these arguments, e.g. one fetched in a batched request"""
+            key = key_for(args, kwargs)
+            with lock:
+                cache[key] = (time.monotonic() + ttl, value)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+        
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            value = lookup(*args, **kwargs)
+            if value is None:
+                value = func(self, *args, **kwargs)
+                store(value, *args, **kwargs)
+            return value
+        
+        wrapper.cache = cache
+        wrapper.cache_lock = lock
+        wrapper.lookup = lookup
+        wrapper.store = store
+        _CACHED_QUERIES.append(wrapper)
+        return wrapper
+    return decorator
+
+def clear_cache():
+    """Drop every memoized query result, e.g. after loading fresh data"""
+    for wrapper in _CACHED_QUERIES:
+        with wrapper.cache_lock:
+            wrapper.cache.clear()
+
 class SnowflakeTools:
-    def __init__(self):
-        self.conn = snowflake.connector.connect(
+    def __init__(self, pool_size: Optional[int] = None):
+        pool_size = pool_size or int(os.getenv('SNOWFLAKE_POOL_SIZE', '4'))
+        # Slots start empty and are connected on first use, so startup does not pay for every login
+        self._pool = queue.Queue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(None)
+        self._executor = ThreadPoolExecutor(max_workers=7, thread_name_prefix="snowflake-query")
+    
+    def _connect(self):
+        return snowflake.connector.connect(
             user=os.getenv('SNOWFLAKE_USER'),
             password=os.getenv('SNOWFLAKE_PASSWORD'),
             account=os.getenv('SNOWFLAKE_ACCOUNT'),
@@ -18,216 +290,205 @@ class SnowflakeTools:
             database=os.getenv('SNOWFLAKE_DATABASE'),
             schema=os.getenv('SNOWFLAKE_RAW_SCHEMA'),
             role=os.getenv('SNOWFLAKE_ROLE'),
-            insecure_mode=True,
+            # Skips OCSP certificate checks; only for networks that block the OCSP responder
+            insecure_mode=os.getenv('SNOWFLAKE_INSECURE_MODE', 'false').lower() == 'true',
+            session_parameters={"PYTHON_CONNECTOR_QUERY_RESULT_FORMAT": "ARROW"},
+            # Idle pooled sessions would otherwise expire and pay a full re-auth on next use
+            client_session_keep_alive=True,
+            client_session_keep_alive_heartbeat_frequency=900,
+            client_prefetch_threads=8,
+            # Bind on the server so each query's SQL text is identical on every call
+            paramstyle='qmark',
         )
     
-    def get_sales_metrics(self, days: int = 30) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+    @contextmanager
+    def _conn(self):
+        """Borrow a pooled connection, reconnecting if it was never opened or has dropped"""
+        conn = self._pool.get(timeout=_POOL_TIMEOUT)
+        try:
+            if conn is None or conn.is_closed():
+                conn = self._connect()
+            yield conn
+        finally:
+            self._pool.put(conn)
+    
+    def _query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Run a query on a pooled connection and return its rows"""
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return _fetch_records(cursor)
+    
+    def _iter_query(self, query: str, params: Optional[tuple],
+                    schema: pa.Schema) -> Iterator[List[Dict[str, Any]]]:
+        """Run a query on a pooled connection and yield its rows one Arrow batch at a time, cast to `schema`.
         
-        query = """
-        SELECT 
-            COUNT(*) as total_orders,
-            SUM(total_amount) as total_revenue,
-            AVG(total_amount) as avg_order_value,
-            COUNT(DISTINCT customer_id) as unique_customers
-        FROM orders 
-        WHERE order_date >= %s AND order_date <= %s
+        The connection stays borrowed until the generator is exhausted or closed.
         """
-        
-        cursor.execute(query, (start_date, end_date))
-        result = cursor.fetchone()
-        
-        return {
-            "period_days": days,
-            "total_orders": result[0] or 0,
-            "total_revenue": float(result[1] or 0),
-            "avg_order_value": float(result[2] or 0),
-            "unique_customers": result[3] or 0
-        }
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            for batch in cursor.fetch_arrow_batches():
+                yield _cast(batch, schema).to_pylist()
+    
+    def _query_arrow(self, query: str, params: Optional[tuple], schema: pa.Schema) -> pa.Table:
+        """Run a query on a pooled connection and return its result as an Arrow table of `schema`"""
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return _fetch_table(cursor, schema)
+    
+    def _query_table(self, query: str, params: Optional[tuple] = None) -> Optional[pa.Table]:
+        """Run a query on a pooled connection and return the normalized Arrow table, or None if empty"""
+        with self._conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            table = cursor.fetch_arrow_all()
+            return _normalize(table) if table is not None else None
+    
+    @ttl_cached(ttl=60)
+    def get_sales_metrics(self, days: int = 30) -> Dict[str, Any]:
+        return _sales_metrics(days, self._query(_SQL_SALES_METRICS, (days,)))
     
     def get_top_products(self, limit: int = 10) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT 
-            p.product_name,
-            SUM(oi.quantity) as total_sold,
-            SUM(oi.total_price) as total_revenue,
-            COUNT(DISTINCT oi.order_id) as orders_count
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.product_id
-        GROUP BY p.product_id, p.product_name
-        ORDER BY total_revenue DESC
-        LIMIT %s
-        """
-        
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
-        
-        products = []
-        for row in results:
-            products.append({
-                "product_name": row[0],
-                "total_sold": row[1],
-                "total_revenue": float(row[2]),
-                "orders_count": row[3]
-            })
-        
-        return {"top_products": products}
+        return {"top_products": self.get_top_products_arrow(limit).to_pylist()}
     
+    @ttl_cached(ttl=300)
+    def get_top_products_arrow(self, limit: int = 10) -> pa.Table:
+        return self._query_arrow(_SQL_TOP_PRODUCTS, (limit,), _TOP_PRODUCTS_SCHEMA)
+    
+    @ttl_cached(ttl=300)
     def get_customer_segments(self) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT 
-            CASE 
-                WHEN annual_income >= 80000 THEN 'High Value'
-                WHEN annual_income >= 50000 THEN 'Mid Value'
-                ELSE 'Low Value'
-            END as segment,
-            COUNT(*) as customer_count,
-            AVG(annual_income) as avg_income
-        FROM customers
-        WHERE is_active = TRUE
-        GROUP BY segment
-        ORDER BY avg_income DESC
-        """
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        segments = []
-        for row in results:
-            segments.append({
-                "segment": row[0],
-                "customer_count": row[1],
-                "avg_income": float(row[2])
-            })
-        
-        return {"customer_segments": segments}
+        return {"customer_segments": self._query(_SQL_CUSTOMER_SEGMENTS)}
     
     def get_sales_trend(self, days: int = 30) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        query = """
-        SELECT 
-            DATE(order_date) as date,
-            SUM(total_amount) as revenue,
-            COUNT(*) as orders
-        FROM orders 
-        WHERE order_date >= %s AND order_date <= %s
-        GROUP BY DATE(order_date)
-        ORDER BY date
-        """
-        
-        cursor.execute(query, (start_date, end_date))
-        results = cursor.fetchall()
-        
-        trend_data = []
-        for row in results:
-            trend_data.append({
-                "date": row[0].strftime('%Y-%m-%d'),
-                "revenue": float(row[1]),
-                "orders": row[2]
-            })
-        
-        return {"sales_trend": trend_data}
+        return {"sales_trend": self.get_sales_trend_arrow(days).to_pylist()}
+    
+    @ttl_cached(ttl=60)
+    def get_sales_trend_arrow(self, days: int = 30) -> pa.Table:
+        return self._query_arrow(_SQL_SALES_TREND, (days,), _SALES_TREND_SCHEMA)
     
+    @ttl_cached(ttl=600)
     def get_revenue_by_category(self) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
-        
-        query = """
-        SELECT 
-            CASE 
-                WHEN p.product_name LIKE '%Pro%' THEN 'Pro'
-                WHEN p.product_name LIKE '%Premium%' THEN 'Premium'
-                WHEN p.product_name LIKE '%Standard%' THEN 'Standard'
-                WHEN p.product_name LIKE '%Lite%' THEN 'Lite'
-                WHEN p.product_name LIKE '%Ultra%' THEN 'Ultra'
-                ELSE 'Other'
-            END as category,
-            SUM(oi.total_price) as revenue,
-            COUNT(DISTINCT oi.order_id) as orders
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.product_id
-        GROUP BY category
-        ORDER BY revenue DESC
-        """
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        categories = []
-        for row in results:
-            categories.append({
-                "category": row[0],
-                "revenue": float(row[1]),
-                "orders": row[2]
-            })
-        
-        return {"revenue_by_category": categories}
+        return {"revenue_by_category": self._query(_SQL_REVENUE_BY_CATEGORY)}
     
+    @ttl_cached(ttl=600)
     def get_monthly_comparison(self, months: int = 6) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
+        return {"monthly_comparison": self._query(_SQL_MONTHLY_COMPARISON, (months,))}
+    
+    def get_customer_lifetime_value(self, limit: int = 10) -> Dict[str, Any]:
+        return {"top_customers": self.get_customer_lifetime_value_arrow(limit).to_pylist()}
+    
+    @ttl_cached(ttl=300)
+    def get_customer_lifetime_value_arrow(self, limit: int = 10) -> pa.Table:
+        return self._query_arrow(_SQL_CUSTOMER_LIFETIME_VALUE, (limit,), _CUSTOMER_LIFETIME_VALUE_SCHEMA)
+    
+    def iter_customer_lifetime_value(self, limit: int = 10) -> Iterator[List[Dict[str, Any]]]:
+        """Top customers by lifetime value, yielded batch by batch as Snowflake returns them (uncached)"""
+        return self._iter_query(_SQL_CUSTOMER_LIFETIME_VALUE, (limit,), _CUSTOMER_LIFETIME_VALUE_SCHEMA)
+    
+    def get_dashboard(self, days: int = 30, months: int = 6, limit: int = 10) -> Dict[str, Any]:
+        """All seven analytics results, keyed like the agents' data, in one round trip.
         
-        query = """
-        SELECT 
-            YEAR(order_date::DATE) || '-' || LPAD(MONTH(order_date::DATE), 2, '0') as month,
-            SUM(total_amount) as revenue,
-            COUNT(*) as orders,
-            AVG(total_amount) as avg_order_value
-        FROM orders 
-        WHERE order_date::DATE >= DATEADD(month, -%s, CURRENT_DATE())
-        GROUP BY YEAR(order_date::DATE), MONTH(order_date::DATE)
-        ORDER BY YEAR(order_date::DATE), MONTH(order_date::DATE)
+        Results still fresh in a method's cache are reused; the rest are sent
+        as one multi-statement request and stored back into those caches.
         """
+        # (data key, cached method, method args, SQL, SQL params, fetch cached value, present it)
+        sections = [
+            ("sales_metrics", self.get_sales_metrics, (days,), _SQL_SALES_METRICS, (days,),
+             lambda cursor: _sales_metrics(days, _fetch_records(cursor)), lambda value: value),
+            ("top_products", self.get_top_products_arrow, (limit,), _SQL_TOP_PRODUCTS, (limit,),
+             lambda cursor: _fetch_table(cursor, _TOP_PRODUCTS_SCHEMA),
+             lambda table: {"top_products": table.to_pylist()}),
+            ("customer_segments", self.get_customer_segments, (), _SQL_CUSTOMER_SEGMENTS, (),
+             lambda cursor: {"customer_segments": _fetch_records(cursor)}, lambda value: value),
+            ("sales_trend", self.get_sales_trend_arrow, (days,), _SQL_SALES_TREND, (days,),
+             lambda cursor: _fetch_table(cursor, _SALES_TREND_SCHEMA),
+             lambda table: {"sales_trend": table.to_pylist()}),
+            ("revenue_by_category", self.get_revenue_by_category, (), _SQL_REVENUE_BY_CATEGORY, (),
+             lambda cursor: {"revenue_by_category": _fetch_records(cursor)}, lambda value: value),
+            ("monthly_comparison", self.get_monthly_comparison, (months,), _SQL_MONTHLY_COMPARISON, (months,),
+             lambda cursor: {"monthly_comparison": _fetch_records(cursor)}, lambda value: value),
+            ("customer_lifetime_value", self.get_customer_lifetime_value_arrow, (limit,), _SQL_CUSTOMER_LIFETIME_VALUE, (limit,),
+             lambda cursor: _fetch_table(cursor, _CUSTOMER_LIFETIME_VALUE_SCHEMA),
+             lambda table: {"top_customers": table.to_pylist()}),
+        ]
         
-        cursor.execute(query, (months,))
-        results = cursor.fetchall()
+        dashboard = {}
+        missing = []
+        for section in sections:
+            cached = section[1].lookup(*section[2])
+            if cached is None:
+                missing.append(section)
+            else:
+                dashboard[section[0]] = section[6](cached)
         
-        monthly_data = []
-        for row in results:
-            monthly_data.append({
-                "month": row[0],
-                "revenue": float(row[1]),
-                "orders": row[2],
-                "avg_order_value": float(row[3])
-            })
+        if missing:
+            query = ";\n".join(section[3].strip() for section in missing)
+            params = tuple(param for section in missing for param in section[4])
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params, num_statements=len(missing))
+                for i, (data_key, method, args, _, _, fetch, present) in enumerate(missing):
+                    if i:
+                        cursor.nextset()
+                    value = fetch(cursor)
+                    method.store(value, *args)
+                    dashboard[data_key] = present(value)
         
-        return {"monthly_comparison": monthly_data}
+        return {data_key: dashboard[data_key] for data_key, *_ in sections}
     
-    def get_customer_lifetime_value(self, limit: int = 10) -> Dict[str, Any]:
-        cursor = self.conn.cursor()
+    def get_all_metrics_parallel(self, days: int = 30, months: int = 6, limit: int = 10) -> Dict[str, Any]:
+        """All seven analytics results, keyed like get_dashboard, with each query on its own pooled connection"""
+        futures = {
+            "sales_metrics": self._executor.submit(self.get_sales_metrics, days),
+            "top_products": self._executor.submit(self.get_top_products, limit),
+            "customer_segments": self._executor.submit(self.get_customer_segments),
+            "sales_trend": self._executor.submit(self.get_sales_trend, days),
+            "revenue_by_category": self._executor.submit(self.get_revenue_by_category),
+            "monthly_comparison": self._executor.submit(self.get_monthly_comparison, months),
+            "customer_lifetime_value": self._executor.submit(self.get_customer_lifetime_value, limit),
+        }
+        return {data_key: future.result() for data_key, future in futures.items()}
+    
+    @ttl_cached(ttl=60)
+    def get_default_dataset(self, days: int = 30, top_n: int = 10) -> Dict[str, Any]:
+        """Sales metrics, daily trend and top products in one round trip.
         
-        query = """
-        SELECT 
-            c.customer_id,
-            CONCAT(c.first_name, ' ', c.last_name) as customer_name,
-            COUNT(DISTINCT o.order_id) as total_orders,
-            SUM(o.total_amount) as lifetime_value,
-            AVG(o.total_amount) as avg_order_value
-        FROM customers c
-        JOIN orders o ON c.customer_id = o.customer_id
-        GROUP BY c.customer_id, customer_name
-        ORDER BY lifetime_value DESC
-        LIMIT %s
+        The orders window is scanned once and shared by the metrics and trend
+        sections; each row is tagged with the section it belongs to.
         """
+        table = self._query_table(_SQL_DEFAULT_DATASET, (days, top_n))
+        if table is None:
+            return {
+                "sales_metrics": {"period_days": days},
+                "top_products": {"top_products": []},
+                "sales_trend": {"sales_trend": []}
+            }
         
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
+        metrics = _section(table, "sales_metrics", {
+            "orders": "total_orders",
+            "revenue": "total_revenue",
+            "avg_order_value": "avg_order_value",
+            "units": "unique_customers",
+        })
+        sales_metrics = {"period_days": days}
+        if metrics:
+            sales_metrics.update({key: value or 0 for key, value in metrics[0].items()})
+        trend_data = _section(table, "sales_trend", {
+            "label": "date",
+            "revenue": "revenue",
+            "orders": "orders",
+        })
+        products = _section(table, "top_products", {
+            "label": "product_name",
+            "units": "total_sold",
+            "revenue": "total_revenue",
+            "orders": "orders_count",
+        })
         
-        customers = []
-        for row in results:
-            customers.append({
-                "customer_id": row[0],
-                "customer_name": row[1],
-                "total_orders": row[2],
-                "lifetime_value": float(row[3]),
-                "avg_order_value": float(row[4])
-            })
-        
-        return {"top_customers": customers}
\ No newline at end of file
+        return {
+            "sales_metrics": sales_metrics,
+            "top_products": {"top_products": products},
+            "sales_trend": {"sales_trend": trend_data}
+        }
\ No newline at end of file